@@ -1,28 +1,123 @@
 """
 Healthcare Symptom Checker - Flask Backend API
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from werkzeug.exceptions import BadRequest
+import orjson
 import os
 from config import Config
 from llm_service import LLMService
 from database import Database
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify and request.get_json)"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def response(self, *args, **kwargs) -> Response:
+        # Hand orjson's bytes straight to the response instead of going
+        # through dumps(), which would decode them only for Flask to re-encode
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        return self._app.response_class(body, mimetype="application/json")
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__, static_folder='static')
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
+
+# Settings read on every request, bound once at import
+DATABASE_ENABLED = Config.DATABASE_ENABLED
+MAX_SYMPTOM_LENGTH = Config.MAX_SYMPTOM_LENGTH
+GROQ_MODEL = Config.GROQ_MODEL
+
+# Largest body a valid request can need: every symptom character escaped as
+# \uXXXX (6 bytes) plus room for the JSON envelope
+MAX_REQUEST_BYTES = MAX_SYMPTOM_LENGTH * 6 + 1024
 CORS(app)
 
+# Reject clients over their budget before any work reaches Groq
+limiter = Limiter(
+    get_remote_address,
+    app=app,
+    default_limits=[Config.RATELIMIT_DEFAULT],
+    storage_uri=Config.RATELIMIT_STORAGE_URI
+)
+analyze_limit = limiter.shared_limit(Config.RATELIMIT_ANALYZE, scope="analyze")
+
 # Initialize services
-llm_service = LLMService()
-db = Database() if Config.DATABASE_ENABLED else None
+db = Database() if DATABASE_ENABLED else None
+llm_service = LLMService(cache_store=db)
 
 @app.route('/')
 def index():
     """Serve the main HTML page"""
     return send_from_directory('static', 'index.html')
 
+def parse_symptoms_request():
+    """
+    Read and validate the symptoms from the request body
+    
+    Returns:
+        Tuple of (symptoms, error_response); error_response is None when valid
+    """
+    # Refuse oversized bodies before reading or parsing them
+    if request.content_length and request.content_length > MAX_REQUEST_BYTES:
+        return None, (jsonify({
+            "success": False,
+            "error": f"Symptom description is too long (maximum {MAX_SYMPTOM_LENGTH} characters)"
+        }), 413)
+    
+    try:
+        # cache=False: the parsed body is used once, don't keep it on the request
+        data = request.get_json(force=True, silent=False, cache=False)
+    except BadRequest:
+        return None, (jsonify({
+            "success": False,
+            "error": "Invalid JSON"
+        }), 400)
+    
+    if not data or not isinstance(data, dict):
+        return None, (jsonify({
+            "success": False,
+            "error": "No data provided"
+        }), 400)
+    
+    raw = data.get('symptoms', '')
+    
+    if not isinstance(raw, str):
+        return None, (jsonify({
+            "success": False,
+            "error": "Symptoms must be provided as text"
+        }), 400)
+    
+    # Oversized input is rejected on length alone, so skip the strip() copy
+    symptoms = raw if len(raw) > MAX_SYMPTOM_LENGTH else raw.strip()
+    
+    # Validate symptoms
+    is_valid, error_message = llm_service.validate_symptoms(symptoms)
+    if not is_valid:
+        return None, (jsonify({
+            "success": False,
+            "error": error_message
+        }), 400)
+    
+    return symptoms, None
+
+def format_sse(event: str, data: dict) -> str:
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
 @app.route('/api/check-symptoms', methods=['POST'])
+@analyze_limit
 def check_symptoms():
     """
     Endpoint to analyze symptoms
@@ -41,24 +136,9 @@ def check_symptoms():
     }
     """
     try:
-        # Get request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({
-                "success": False,
-                "error": "No data provided"
-            }), 400
-        
-        symptoms = data.get('symptoms', '').strip()
-        
-        # Validate symptoms
-        is_valid, error_message = llm_service.validate_symptoms(symptoms)
-        if not is_valid:
-            return jsonify({
-                "success": False,
-                "error": error_message
-            }), 400
+        symptoms, error_response = parse_symptoms_request()
+        if error_response:
+            return error_response
         
         # Analyze symptoms using LLM
         result = llm_service.analyze_symptoms(symptoms)
@@ -67,9 +147,9 @@ def check_symptoms():
             return jsonify(result), 500
         
         # Save to database if enabled
-        if db and Config.DATABASE_ENABLED:
+        if db and DATABASE_ENABLED:
             try:
-                query_id = db.save_query(symptoms, result['analysis'])
+                query_id = db.enqueue_save(symptoms, result['analysis'])
                 result['query_id'] = query_id
             except Exception as e:
                 # Log error but don't fail the request
@@ -82,7 +162,8 @@ def check_symptoms():
             "disclaimer": result['disclaimer'],
             "metadata": {
                 "model": result['model'],
-                "tokens_used": result.get('tokens_used', 0)
+                "tokens_used": result.get('tokens_used', 0),
+                "cached": result.get('cached', False)
             },
             "query_id": result.get('query_id')
         }), 200
@@ -94,6 +175,84 @@ def check_symptoms():
             "error": "An error occurred while processing your request"
         }), 500
 
+@app.route('/api/check-symptoms/stream', methods=['POST'])
+@analyze_limit
+def check_symptoms_stream():
+    """
+    Endpoint to analyze symptoms, streaming the analysis as it is generated
+    
+    Expected JSON payload:
+    {
+        "symptoms": "description of symptoms"
+    }
+    
+    Returns a text/event-stream of:
+    - "chunk" events: {"content": "next piece of the analysis"}
+    - a final "done" event with the same body as /api/check-symptoms, or
+    - a final "error" event: {"success": false, "error": "..."}
+    """
+    try:
+        symptoms, error_response = parse_symptoms_request()
+        if error_response:
+            return error_response
+    except Exception as e:
+        app.logger.error(f"Error processing request: {e}")
+        return jsonify({
+            "success": False,
+            "error": "An error occurred while processing your request"
+        }), 500
+    
+    def generate():
+        try:
+            for event in llm_service.stream_symptoms(symptoms):
+                if event['type'] == 'chunk':
+                    yield format_sse('chunk', {"content": event['content']})
+                    continue
+                
+                if event['type'] == 'error':
+                    yield format_sse('error', {
+                        "success": False,
+                        "error": event['error']
+                    })
+                    continue
+                
+                # Save to database once the full analysis is known
+                query_id = None
+                if db and DATABASE_ENABLED:
+                    try:
+                        query_id = db.enqueue_save(symptoms, event['analysis'])
+                    except Exception as e:
+                        # Log error but don't fail the request
+                        app.logger.error(f"Database error: {e}")
+                
+                yield format_sse('done', {
+                    "success": True,
+                    "analysis": event['analysis'],
+                    "disclaimer": event['disclaimer'],
+                    "metadata": {
+                        "model": event['model'],
+                        "tokens_used": event.get('tokens_used', 0),
+                        "cached": event.get('cached', False)
+                    },
+                    "query_id": query_id
+                })
+        
+        except Exception as e:
+            app.logger.error(f"Error streaming response: {e}")
+            yield format_sse('error', {
+                "success": False,
+                "error": "An error occurred while processing your request"
+            })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
     """
@@ -108,7 +267,7 @@ def get_history():
         "history": [...]
     }
     """
-    if not db or not Config.DATABASE_ENABLED:
+    if not db or not DATABASE_ENABLED:
         return jsonify({
             "success": False,
             "error": "Database not enabled"
@@ -133,7 +292,7 @@ def get_history():
             "error": "An error occurred while retrieving history"
         }), 500
 
-@app.route('/api/query/<int:query_id>', methods=['GET'])
+@app.route('/api/query/<query_id>', methods=['GET'])
 def get_query(query_id):
     """
     Get a specific query by ID
@@ -144,7 +303,7 @@ def get_query(query_id):
         "query": {...}
     }
     """
-    if not db or not Config.DATABASE_ENABLED:
+    if not db or not DATABASE_ENABLED:
         return jsonify({
             "success": False,
             "error": "Database not enabled"
@@ -176,8 +335,8 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "database_enabled": Config.DATABASE_ENABLED,
-        "model": Config.GROQ_MODEL
+        "database_enabled": DATABASE_ENABLED,
+        "model": GROQ_MODEL
     }), 200
 
 @app.errorhandler(404)
@@ -188,6 +347,14 @@ def not_found(e):
         "error": "Endpoint not found"
     }), 404
 
+@app.errorhandler(429)
+def rate_limited(e):
+    """Handle rate limit errors"""
+    return jsonify({
+        "success": False,
+        "error": "Too many requests. Please wait a moment and try again."
+    }), 429
+
 @app.errorhandler(500)
 def internal_error(e):
     """Handle 500 errors"""
@@ -200,7 +367,7 @@ if __name__ == '__main__':
     # Create static directory if it doesn't exist
     os.makedirs('static', exist_ok=True)
     
-    # Run the app
+    # Run the development server (production: gunicorn wsgi:app, see wsgi.py)
     app.run(
         host='0.0.0.0',
         port=5000,
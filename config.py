@@ -19,15 +19,28 @@ class Config:
     GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
     GROQ_TEMPERATURE = float(os.getenv('GROQ_TEMPERATURE', '0.7'))
     GROQ_MAX_TOKENS = int(os.getenv('GROQ_MAX_TOKENS', '1000'))
+    GROQ_POOL_SIZE = int(os.getenv('GROQ_POOL_SIZE', '100'))
     
     # Database settings
     DATABASE_ENABLED = os.getenv('DATABASE_ENABLED', 'True').lower() == 'true'
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'symptom_checker.db')
+    QUERY_RETENTION_DAYS = int(os.getenv('QUERY_RETENTION_DAYS', '30'))
+    MAINTENANCE_INTERVAL_HOURS = float(os.getenv('MAINTENANCE_INTERVAL_HOURS', '24'))
+    
+    # Response cache settings (identical symptom descriptions skip the LLM call)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '1024'))
+    CACHE_TTL_DAYS = int(os.getenv('CACHE_TTL_DAYS', '7'))
     
     # Application settings
     MAX_SYMPTOM_LENGTH = int(os.getenv('MAX_SYMPTOM_LENGTH', '1000'))
     RESPONSE_TIMEOUT = int(os.getenv('RESPONSE_TIMEOUT', '30'))
     
+    # Rate limiting (per client IP; use a redis:// URI when running several workers)
+    RATELIMIT_DEFAULT = os.getenv('RATELIMIT_DEFAULT', '60 per minute')
+    RATELIMIT_ANALYZE = os.getenv('RATELIMIT_ANALYZE', '10 per minute')
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    
     # Medical disclaimer
     MEDICAL_DISCLAIMER = """
     ⚕️ IMPORTANT MEDICAL DISCLAIMER ⚕️
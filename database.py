@@ -2,45 +2,199 @@
 Database layer for storing symptom query history
 """
 import sqlite3
+import orjson
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from itertools import groupby
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from config import Config
 
+try:
+    from gevent import get_hub
+    from gevent.monkey import is_module_patched
+except ImportError:
+    get_hub = None
+
+logger = logging.getLogger(__name__)
+
+# Background writer flushes queued writes in batches of up to this many rows,
+# waiting at most this long (seconds) for a batch to fill
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_WINDOW = 0.01
+
+def run_blocking(func, *args):
+    """
+    Run blocking SQLite work without stalling other requests
+    
+    gevent does not patch the sqlite3 C module, so under the gunicorn gevent
+    workers a query blocks every greenlet on the hub, including the
+    background "threads" below. When the process is monkey-patched, the work
+    runs on gevent's native threadpool and only the calling greenlet waits.
+    Otherwise the call runs in place.
+    """
+    if get_hub is not None and is_module_patched('threading'):
+        return get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+# Hot-path statements, compiled once per connection and then served from
+# sqlite3's prepared-statement cache
+STATEMENT_CACHE_SIZE = 256
+
+_SQL_INSERT = '''
+    INSERT INTO queries (query_id, symptoms, response, session_id)
+    VALUES (?, ?, ?, ?)
+'''
+
+_SQL_SELECT_RECENT = '''
+    SELECT query_id AS id, symptoms, response, timestamp
+    FROM queries
+    ORDER BY timestamp DESC, queries.id DESC
+    LIMIT ?
+'''
+
+_SQL_SELECT_BY_ID = '''
+    SELECT query_id AS id, symptoms, response, timestamp
+    FROM queries
+    WHERE query_id = ?
+'''
+
+_SQL_SELECT_CACHED = '''
+    SELECT response, CAST(strftime('%s', timestamp) AS INTEGER) AS cached_at
+    FROM response_cache
+    WHERE hash = ? AND timestamp >= datetime('now', ?)
+'''
+
+_SQL_SAVE_CACHED = '''
+    INSERT OR REPLACE INTO response_cache (hash, response)
+    VALUES (?, ?)
+'''
+
 class Database:
     """SQLite database handler for symptom queries"""
     
     def __init__(self, db_path: str = None):
         """Initialize database connection"""
         self.db_path = db_path or Config.DATABASE_PATH
-        self.init_db()
+        self._conn = None
+        run_blocking(self.init_db)
+        
+        # Query history and cache entries are written off the request path by
+        # a single writer
+        self._write_queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='db-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+        
+        # Old rows are pruned and the file compacted periodically, on a
+        # separate connection so requests never queue behind a long DELETE
+        self._stop_maintenance = threading.Event()
+        self._maintenance = threading.Thread(target=self._maintenance_loop, name='db-maintenance', daemon=True)
+        self._maintenance.start()
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        Get the shared database connection, opening it on first use
+        
+        The connection is kept open for the lifetime of the process and runs
+        in autocommit mode with WAL journaling, so readers never block the
+        writer and each statement skips the connect/schema-parse cost.
+        """
+        conn = self._conn
+        if conn is None:
+            conn = self._connect()
+            self._conn = conn
+        return conn
+    
+    def _connect(self):
+        """Open a new connection with the standard pragmas applied"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
         conn.row_factory = sqlite3.Row
+        # auto_vacuum only takes effect if set before the first table is created
+        conn.executescript('''
+            PRAGMA auto_vacuum=INCREMENTAL;
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-20000;
+        ''')
         return conn
     
+    def close(self):
+        """Close the shared database connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
     def init_db(self):
         """Initialize database schema"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        # Databases created before incremental auto-vacuum need one full VACUUM
+        # to switch over; afterwards freed pages are reclaimed in small steps
+        if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            try:
+                cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                cursor.execute('VACUUM')
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Could not enable incremental auto-vacuum: {e}")
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS queries (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 symptoms TEXT NOT NULL,
                 response TEXT NOT NULL,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                session_id TEXT
+                session_id TEXT,
+                query_id TEXT
             )
         ''')
         
-        conn.commit()
-        conn.close()
+        # Public query IDs are generated before the row is written, so they
+        # can be returned to the client without waiting for the INSERT
+        columns = [row['name'] for row in cursor.execute('PRAGMA table_info(queries)')]
+        if 'query_id' not in columns:
+            cursor.execute('ALTER TABLE queries ADD COLUMN query_id TEXT')
+            cursor.execute('''
+                UPDATE queries
+                SET query_id = CAST(id AS TEXT)
+                WHERE query_id IS NULL
+            ''')
+        
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_queries_query_id
+            ON queries(query_id)
+        ''')
+        
+        # Lets get_recent_queries walk the index in order instead of sorting;
+        # id breaks ties between rows saved in the same second
+        cursor.execute('DROP INDEX IF EXISTS idx_queries_ts')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_queries_ts_id
+            ON queries(timestamp DESC, id DESC)
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                hash TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
     
-    def save_query(self, symptoms: str, response: str, session_id: str = None) -> int:
+    def enqueue_save(self, symptoms: str, response: str, session_id: str = None) -> str:
         """
-        Save a symptom query to the database
+        Queue a symptom query to be saved by the background writer
         
         Args:
             symptoms: User's symptom description
@@ -48,21 +202,67 @@ class Database:
             session_id: Optional session identifier
             
         Returns:
-            Query ID
+            Query ID (the row becomes readable once the writer flushes it)
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        query_id = uuid.uuid4().hex
+        self._write_queue.put((_SQL_INSERT, (query_id, symptoms, response, session_id)))
+        return query_id
+    
+    def flush(self):
+        """Write out all queued queries and stop the background threads"""
+        self._stop_maintenance.set()
+        if self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join()
+    
+    def _write_loop(self):
+        """Drain the write queue, applying writes in batched transactions"""
+        conn = self._connect()
+        running = True
         
-        cursor.execute('''
-            INSERT INTO queries (symptoms, response, session_id)
-            VALUES (?, ?, ?)
-        ''', (symptoms, response, session_id))
+        while running:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + WRITE_BATCH_WINDOW
+            
+            while len(batch) < WRITE_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            if None in batch:
+                running = False
+                batch = [item for item in batch if item is not None]
+            
+            if not batch:
+                continue
+            
+            run_blocking(self._write_batch, conn, batch)
         
-        query_id = cursor.lastrowid
-        conn.commit()
         conn.close()
-        
-        return query_id
+    
+    def _write_batch(self, conn, batch: List[Tuple[str, Tuple]]):
+        """Apply a batch of queued (statement, params) writes in a single transaction"""
+        try:
+            conn.execute('BEGIN')
+            for sql, items in groupby(batch, key=lambda item: item[0]):
+                conn.executemany(sql, [params for _, params in items])
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            logger.error(f"Failed to write {len(batch)} rows: {e}")
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    
+    def _fetch(self, sql: str, params: Tuple, one: bool = False):
+        """Run a read on the shared connection (called via run_blocking)"""
+        cursor = self.get_connection().execute(sql, params)
+        if one:
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        return [dict(row) for row in cursor.fetchall()]
     
     def get_recent_queries(self, limit: int = 10) -> List[Dict]:
         """
@@ -74,22 +274,9 @@ class Database:
         Returns:
             List of query dictionaries
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, symptoms, response, timestamp
-            FROM queries
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in rows]
+        return run_blocking(self._fetch, _SQL_SELECT_RECENT, (limit,))
     
-    def get_query_by_id(self, query_id: int) -> Optional[Dict]:
+    def get_query_by_id(self, query_id: str) -> Optional[Dict]:
         """
         Get a specific query by ID
         
@@ -99,34 +286,96 @@ class Database:
         Returns:
             Query dictionary or None
         """
-        conn = self.get_connection()
+        return run_blocking(self._fetch, _SQL_SELECT_BY_ID, (query_id,), True)
+    
+    def clear_old_queries(self, days: int = 30, conn=None):
+        """
+        Clear queries older than specified days
+        
+        Args:
+            days: Number of days to keep
+            conn: Connection to use (defaults to the shared connection)
+        """
+        conn = conn or self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT id, symptoms, response, timestamp
-            FROM queries
-            WHERE id = ?
-        ''', (query_id,))
+            DELETE FROM queries
+            WHERE timestamp < datetime('now', ?)
+        ''', (f"-{days} days",))
         
-        row = cursor.fetchone()
-        conn.close()
+        self.optimize(conn)
+    
+    def get_cached_response(self, cache_key: str, ttl_days: int = 7) -> Optional[Tuple[Dict, float]]:
+        """
+        Get a cached LLM response
         
-        return dict(row) if row else None
+        Args:
+            cache_key: Hash of the normalized symptoms
+            ttl_days: Ignore entries older than this many days
+            
+        Returns:
+            Tuple of (cached response dictionary, Unix time it was cached) or None
+        """
+        row = run_blocking(self._fetch, _SQL_SELECT_CACHED, (cache_key, f"-{ttl_days} days"), True)
+        
+        return (orjson.loads(row['response']), row['cached_at']) if row else None
     
-    def clear_old_queries(self, days: int = 30):
+    def save_cached_response(self, cache_key: str, response: Dict):
         """
-        Clear queries older than specified days
+        Queue an LLM response to be cached by the background writer
+        
+        Args:
+            cache_key: Hash of the normalized symptoms
+            response: Response dictionary to cache
+        """
+        self._write_queue.put((_SQL_SAVE_CACHED, (cache_key, orjson.dumps(response).decode())))
+    
+    def clear_old_cache(self, days: int = 7, conn=None):
+        """
+        Clear cached responses older than specified days
         
         Args:
             days: Number of days to keep
+            conn: Connection to use (defaults to the shared connection)
         """
-        conn = self.get_connection()
+        conn = conn or self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-            DELETE FROM queries
-            WHERE timestamp < datetime('now', '-' || ? || ' days')
-        ''', (days,))
+            DELETE FROM response_cache
+            WHERE timestamp < datetime('now', ?)
+        ''', (f"-{days} days",))
         
-        conn.commit()
-        conn.close()
+        self.optimize(conn)
+    
+    def optimize(self, conn=None):
+        """Return free pages to the filesystem and refresh planner statistics"""
+        conn = conn or self.get_connection()
+        
+        # executescript steps each pragma to completion; a plain execute()
+        # would let incremental_vacuum free only a single page
+        conn.executescript('''
+            PRAGMA incremental_vacuum;
+            PRAGMA optimize;
+        ''')
+    
+    def _maintenance_loop(self):
+        """Prune old queries and cached responses once per maintenance interval"""
+        interval = Config.MAINTENANCE_INTERVAL_HOURS * 3600
+        conn = None
+        
+        while not self._stop_maintenance.wait(interval):
+            try:
+                conn = conn or self._connect()
+                run_blocking(self._prune, conn)
+            except sqlite3.Error as e:
+                logger.error(f"Database maintenance failed: {e}")
+        
+        if conn is not None:
+            conn.close()
+    
+    def _prune(self, conn):
+        """Delete expired cached responses and queries, then compact the file"""
+        self.clear_old_cache(Config.CACHE_TTL_DAYS, conn)
+        self.clear_old_queries(Config.QUERY_RETENTION_DAYS, conn)
@@ -0,0 +1,41 @@
+"""
+Per-request string helpers for symptom input
+
+Kept free of other project imports and fully annotated so the module can be
+compiled to a C extension with mypyc (`mypyc fastpath.py`); the plain Python
+module is used when no compiled build is present.
+"""
+import string
+from typing import Tuple
+
+# Punctuation becomes a space rather than being deleted, so "2.5mg" and
+# "25mg" (or "3-4 days" and "34 days") stay distinct cache keys
+_PUNCTUATION_TABLE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+def normalize_symptoms(symptoms: str) -> str:
+    """Lowercase, replace punctuation with spaces and collapse whitespace"""
+    return ' '.join(symptoms.lower().translate(_PUNCTUATION_TABLE).split())
+
+def validate_symptoms(symptoms: str, max_length: int) -> Tuple[bool, str]:
+    """
+    Validate symptom input
+    
+    Args:
+        symptoms: User's symptom description (already stripped)
+        max_length: Maximum allowed length in characters
+        
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    n = len(symptoms)
+    
+    if n == 0:
+        return False, "Please provide a description of your symptoms"
+    
+    if n < 10:
+        return False, "Please provide a more detailed description of your symptoms (at least 10 characters)"
+    
+    if n > max_length:
+        return False, f"Symptom description is too long (maximum {max_length} characters)"
+    
+    return True, ""
@@ -0,0 +1,26 @@
+"""
+gunicorn configuration for the Healthcare Symptom Checker
+
+Each /api/check-symptoms request spends almost all of its time waiting on
+Groq, so workers use gevent: one process multiplexes many in-flight LLM
+calls on a single event loop instead of tying up one thread per request.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Event-loop workers (see wsgi.py for the monkey-patching)
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_connections = int(os.getenv('WORKER_CONNECTIONS', '1000'))
+
+# Groq calls can take several seconds; leave headroom over RESPONSE_TIMEOUT
+timeout = int(os.getenv('RESPONSE_TIMEOUT', '30')) + 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
@@ -1,28 +1,32 @@
 """
 LLM Service for symptom analysis using Groq API (FREE & FAST!)
 """
-import requests
-import json
-from typing import Dict, Tuple
+import httpx
+import orjson
+import certifi
+import hashlib
+import logging
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional, Iterator
 from config import Config
+import fastpath
 
-class LLMService:
-    """Service for interacting with Groq API for symptom analysis"""
-    
-    def __init__(self):
-        """Initialize Groq client"""
-        if not Config.GROQ_API_KEY:
-            raise ValueError("GROQ_API_KEY not found in environment variables. Get free API key at https://console.groq.com")
-        
-        self.api_key = Config.GROQ_API_KEY
-        self.model = Config.GROQ_MODEL
-        self.temperature = Config.GROQ_TEMPERATURE
-        self.max_tokens = Config.GROQ_MAX_TOKENS
-        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
-    
-    def get_system_prompt(self) -> str:
-        """Get the system prompt for symptom analysis"""
-        return """You are a medical education assistant designed to help people understand potential health conditions based on symptoms.
+logger = logging.getLogger(__name__)
+
+# Bumped whenever normalization changes, so entries persisted under the old
+# rules are never matched (v1 deleted punctuation, merging "2.5mg" with "25mg")
+CACHE_KEY_VERSION = "v2"
+
+# Groq responses worth retrying (rate limit and transient server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 2
+RETRY_BACKOFF = 0.2
+
+# Prompt pieces are built once at import; only the user message varies per request
+SYSTEM_PROMPT = """You are a medical education assistant designed to help people understand potential health conditions based on symptoms.
 
 Your role is to:
 1. Analyze the symptoms provided by the user
@@ -48,6 +52,192 @@ Format your response as follows:
 
 Be helpful, educational, and prioritize user safety above all."""
 
+SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+_USER_PREFIX = "I am experiencing the following symptoms:\n\n"
+_USER_SUFFIX = "\n\nWhat could these symptoms indicate? Please provide educational information."
+
+class LLMService:
+    """Service for interacting with Groq API for symptom analysis"""
+    
+    def __init__(self, cache_store=None):
+        """
+        Initialize Groq client
+        
+        Args:
+            cache_store: Optional persistent cache (e.g. Database) backing the
+                in-memory response cache
+        """
+        if not Config.GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY not found in environment variables. Get free API key at https://console.groq.com")
+        
+        self.api_key = Config.GROQ_API_KEY
+        self.model = Config.GROQ_MODEL
+        self.temperature = Config.GROQ_TEMPERATURE
+        self.max_tokens = Config.GROQ_MAX_TOKENS
+        self.max_symptom_length = Config.MAX_SYMPTOM_LENGTH
+        self.disclaimer = Config.MEDICAL_DISCLAIMER
+        self.api_url = "https://api.groq.com/openai/v1/chat/completions"
+        self.models_url = "https://api.groq.com/openai/v1/models"
+        
+        # Request fields that never change between calls
+        self._payload_template = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": 0.9
+        }
+        
+        # Reuse one keep-alive connection pool for every Groq call instead of
+        # paying a fresh TCP + TLS handshake per request. With HTTP/2, concurrent
+        # requests (gevent greenlets) are multiplexed over the same connection.
+        limits = httpx.Limits(
+            max_connections=Config.GROQ_POOL_SIZE,
+            max_keepalive_connections=Config.GROQ_POOL_SIZE
+        )
+        
+        # TLS 1.3 only: one round trip for the handshake
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        ssl_context.minimum_version = ssl.TLSVersion.TLSv1_3
+        
+        self.client = httpx.Client(
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(Config.RESPONSE_TIMEOUT, connect=3.0),
+            transport=httpx.HTTPTransport(
+                http2=True,
+                verify=ssl_context,
+                limits=limits,
+                retries=2
+            )
+        )
+        
+        # Open the first connection in the background so the first user
+        # request does not pay for the TCP + TLS handshake
+        threading.Thread(target=self.warm_up, name='groq-warmup', daemon=True).start()
+        
+        # LRU response cache keyed by normalized symptoms
+        self.cache_enabled = Config.CACHE_ENABLED
+        self.cache_max_size = Config.CACHE_MAX_SIZE
+        self.cache_ttl_days = Config.CACHE_TTL_DAYS
+        self.cache_ttl_seconds = self.cache_ttl_days * 86400
+        self.cache_store = cache_store
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def warm_up(self):
+        """Open a pooled connection to Groq with a cheap request"""
+        try:
+            self.client.get(self.models_url, timeout=3.0)
+        except httpx.HTTPError as e:
+            logger.info(f"Groq connection warm-up failed: {e}")
+    
+    def get_system_prompt(self) -> str:
+        """Get the system prompt for symptom analysis"""
+        return SYSTEM_PROMPT
+
+    def get_cache_key(self, symptoms: str) -> str:
+        """Build the cache key for a symptom description"""
+        key = f"{CACHE_KEY_VERSION}|{self.model}|{self.temperature}|{self.max_tokens}|{fastpath.normalize_symptoms(symptoms)}"
+        # blake2b rather than blake3: keys are at most ~1 KB, where blake3's
+        # SIMD tree hashing does not pay off (measured ~100 B: 0.57 vs 0.75 us,
+        # ~1 KB: 1.9 vs 1.7 us per key) and it would add a compiled dependency
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    
+    def get_cached_response(self, cache_key: str) -> Optional[Dict]:
+        """
+        Look up a cached analysis, in memory first, then in the persistent store
+        
+        Args:
+            cache_key: Key from get_cache_key
+            
+        Returns:
+            Cached {analysis, tokens_used, model} dictionary or None
+        """
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                cached_at, cached = entry
+                if time.time() - cached_at < self.cache_ttl_seconds:
+                    self._cache.move_to_end(cache_key)
+                    return cached
+                del self._cache[cache_key]
+        
+        if self.cache_store is None:
+            return None
+        
+        try:
+            stored = self.cache_store.get_cached_response(cache_key, self.cache_ttl_days)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+        
+        if stored is None:
+            return None
+        
+        cached, cached_at = stored
+        self._remember(cache_key, cached, cached_at)
+        return cached
+    
+    def cache_response(self, cache_key: str, cached: Dict):
+        """
+        Store an analysis in the in-memory and persistent caches
+        
+        Args:
+            cache_key: Key from get_cache_key
+            cached: {analysis, tokens_used, model} dictionary
+        """
+        self._remember(cache_key, cached, time.time())
+        
+        if self.cache_store is None:
+            return
+        
+        try:
+            self.cache_store.save_cached_response(cache_key, cached)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
+    
+    def _remember(self, cache_key: str, cached: Dict, cached_at: float):
+        """Insert into the in-memory LRU, evicting the oldest entry when full"""
+        with self._cache_lock:
+            self._cache[cache_key] = (cached_at, cached)
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.cache_max_size:
+                self._cache.popitem(last=False)
+    
+    def build_payload(self, symptoms: str) -> Dict[str, any]:
+        """Build the Groq chat completion payload for a symptom description"""
+        payload = self._payload_template.copy()
+        payload["messages"] = [
+            SYSTEM_MSG,
+            {"role": "user", "content": "".join((_USER_PREFIX, symptoms, _USER_SUFFIX))}
+        ]
+        return payload
+    
+    def _post(self, payload: Dict[str, any], stream: bool = False) -> httpx.Response:
+        """
+        Send a chat completion request, retrying rate-limit and server errors
+        
+        Args:
+            payload: Request body
+            stream: Leave the response body unread; the caller must close it
+            
+        Returns:
+            The final response, whatever its status
+        """
+        # Serialize with orjson rather than letting httpx run stdlib json
+        request = self.client.build_request("POST", self.api_url, content=orjson.dumps(payload))
+        
+        for attempt in range(MAX_RETRIES + 1):
+            response = self.client.send(request, stream=stream)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            
+            response.close()
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+    
     def analyze_symptoms(self, symptoms: str) -> Dict[str, any]:
         """
         Analyze symptoms using Groq API
@@ -58,35 +248,16 @@ Be helpful, educational, and prioritize user safety above all."""
         Returns:
             Dictionary containing analysis results and metadata
         """
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = self.get_cache_key(symptoms)
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                return self._success_result(cached['analysis'], cached['tokens_used'], cached=True)
+        
         try:
-            # Prepare the request payload
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": self.get_system_prompt()
-                    },
-                    {
-                        "role": "user",
-                        "content": f"I am experiencing the following symptoms:\n\n{symptoms}\n\nWhat could these symptoms indicate? Please provide educational information."
-                    }
-                ],
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "top_p": 0.9
-            }
-            
             # Call Groq API
-            response = requests.post(
-                self.api_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=30
-            )
+            response = self._post(self.build_payload(symptoms))
             
             if response.status_code != 200:
                 return {
@@ -96,76 +267,191 @@ Be helpful, educational, and prioritize user safety above all."""
                 }
             
             # Extract response
-            result = response.json()
-            analysis = result['choices'][0]['message']['content']
-            
-            # Add disclaimer if not present
-            if "EDUCATIONAL" not in analysis.upper() and "NOT MEDICAL ADVICE" not in analysis.upper():
-                analysis = "⚠️ EDUCATIONAL INFORMATION ONLY - NOT MEDICAL ADVICE ⚠️\n\n" + analysis
+            result = orjson.loads(response.content)
+            analysis = self._add_disclaimer(result['choices'][0]['message']['content'])
             
             # Get token usage
             tokens_used = result.get('usage', {}).get('total_tokens', 0)
             
-            return {
-                "success": True,
+            if cache_key is not None:
+                self.cache_response(cache_key, {
+                    "analysis": analysis,
+                    "tokens_used": tokens_used,
+                    "model": self.model
+                })
+            
+            return self._success_result(analysis, tokens_used)
+            
+        except Exception as e:
+            return self._error_result(e)
+    
+    def stream_symptoms(self, symptoms: str) -> Iterator[Dict[str, any]]:
+        """
+        Analyze symptoms using Groq API, yielding the analysis as it is generated
+        
+        Args:
+            symptoms: User's symptom description
+            
+        Yields:
+            {"type": "chunk", "content": ...} for each piece of generated text,
+            then a final analyze_symptoms-style result with "type" set to
+            "done" (success) or "error"
+        """
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = self.get_cache_key(symptoms)
+            cached = self.get_cached_response(cache_key)
+            if cached is not None:
+                yield {"type": "chunk", "content": cached['analysis']}
+                yield {"type": "done", **self._success_result(cached['analysis'], cached['tokens_used'], cached=True)}
+                return
+        
+        payload = self.build_payload(symptoms)
+        payload["stream"] = True
+        
+        chunks = []
+        tokens_used = 0
+        finished = False
+        
+        try:
+            response = self._post(payload, stream=True)
+            try:
+                if response.status_code != 200:
+                    response.read()
+                    yield {
+                        "type": "error",
+                        "success": False,
+                        "error": f"Groq API error: {response.status_code} - {response.text}",
+                        "error_type": "api_error"
+                    }
+                    return
+                
+                # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                for line in response.iter_lines():
+                    if not line or not line.startswith("data:"):
+                        continue
+                    
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        finished = True
+                        break
+                    
+                    event = orjson.loads(data)
+                    
+                    # Groq reports failures mid-stream as an in-band error event
+                    if 'error' in event:
+                        error = event['error']
+                        message = error.get('message', error) if isinstance(error, dict) else error
+                        yield {
+                            "type": "error",
+                            "success": False,
+                            "error": f"Groq API error: {message}",
+                            "error_type": "api_error"
+                        }
+                        return
+                    
+                    usage = event.get('x_groq', {}).get('usage') or event.get('usage')
+                    if usage:
+                        tokens_used = usage.get('total_tokens', tokens_used)
+                    
+                    if not event.get('choices'):
+                        continue
+                    
+                    content = event['choices'][0].get('delta', {}).get('content')
+                    if content:
+                        chunks.append(content)
+                        yield {"type": "chunk", "content": content}
+            finally:
+                response.close()
+        
+        except Exception as e:
+            yield {"type": "error", **self._error_result(e)}
+            return
+        
+        # A stream that stops before [DONE] holds a truncated analysis; never
+        # cache or report it as complete
+        if not finished or not chunks:
+            yield {
+                "type": "error",
+                "success": False,
+                "error": "Groq stream ended before the analysis was complete",
+                "error_type": "api_error"
+            }
+            return
+        
+        analysis = self._add_disclaimer("".join(chunks))
+        
+        if cache_key is not None:
+            self.cache_response(cache_key, {
                 "analysis": analysis,
-                "model": self.model,
                 "tokens_used": tokens_used,
-                "disclaimer": Config.MEDICAL_DISCLAIMER
-            }
-            
-        except requests.exceptions.Timeout:
+                "model": self.model
+            })
+        
+        yield {"type": "done", **self._success_result(analysis, tokens_used)}
+    
+    def _add_disclaimer(self, analysis: str) -> str:
+        """Prefix the analysis with the educational disclaimer if the model left it out"""
+        if "EDUCATIONAL" not in analysis.upper() and "NOT MEDICAL ADVICE" not in analysis.upper():
+            analysis = "⚠️ EDUCATIONAL INFORMATION ONLY - NOT MEDICAL ADVICE ⚠️\n\n" + analysis
+        return analysis
+    
+    def _success_result(self, analysis: str, tokens_used: int, cached: bool = False) -> Dict[str, any]:
+        """Build a successful analysis result"""
+        return {
+            "success": True,
+            "analysis": analysis,
+            "model": self.model,
+            "tokens_used": tokens_used,
+            "disclaimer": self.disclaimer,
+            "cached": cached
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, any]:
+        """Map an exception raised while calling Groq to an error result"""
+        if isinstance(e, httpx.TimeoutException):
             return {
                 "success": False,
                 "error": "Request timed out. Please try again.",
                 "error_type": "timeout"
             }
-        except requests.exceptions.RequestException as e:
+        if isinstance(e, httpx.RequestError):
             return {
                 "success": False,
                 "error": f"Network error: {str(e)}",
                 "error_type": "network_error"
             }
-        except Exception as e:
-            error_msg = str(e).lower()
-            
-            # Handle specific error types
-            if "api key" in error_msg or "authentication" in error_msg or "401" in error_msg:
-                return {
-                    "success": False,
-                    "error": "API authentication failed. Please check your Groq API key.",
-                    "error_type": "auth_error"
-                }
-            elif "quota" in error_msg or "rate limit" in error_msg or "429" in error_msg:
-                return {
-                    "success": False,
-                    "error": "Rate limit exceeded. Please try again in a moment.",
-                    "error_type": "rate_limit"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"Error: {str(e)}",
-                    "error_type": "api_error"
-                }
+        
+        error_msg = str(e).lower()
+        
+        # Handle specific error types
+        if "api key" in error_msg or "authentication" in error_msg or "401" in error_msg:
+            return {
+                "success": False,
+                "error": "API authentication failed. Please check your Groq API key.",
+                "error_type": "auth_error"
+            }
+        elif "quota" in error_msg or "rate limit" in error_msg or "429" in error_msg:
+            return {
+                "success": False,
+                "error": "Rate limit exceeded. Please try again in a moment.",
+                "error_type": "rate_limit"
+            }
+        else:
+            return {
+                "success": False,
+                "error": f"Error: {str(e)}",
+                "error_type": "api_error"
+            }
     
     def validate_symptoms(self, symptoms: str) -> (bool, str):
         """
         Validate symptom input
         
         Args:
-            symptoms: User's symptom description
+            symptoms: User's symptom description (already stripped)
             
         Returns:
             Tuple of (is_valid, error_message)
         """
-        if not symptoms or not symptoms.strip():
-            return False, "Please provide a description of your symptoms"
-        
-        if len(symptoms) < 10:
-            return False, "Please provide a more detailed description of your symptoms (at least 10 characters)"
-        
-        if len(symptoms) > Config.MAX_SYMPTOM_LENGTH:
-            return False, f"Symptom description is too long (maximum {Config.MAX_SYMPTOM_LENGTH} characters)"
-        
-        return True, ""
+        return fastpath.validate_symptoms(symptoms, self.max_symptom_length)
@@ -84,6 +84,7 @@ retryBtn.addEventListener('click', () => {
 
 /**
  * Analyze symptoms by calling the backend API
+ * The analysis is streamed and rendered as it is generated
  */
 async function analyzeSymptoms(symptoms) {
     try {
@@ -91,7 +92,7 @@ async function analyzeSymptoms(symptoms) {
         showLoading();
         
         // Call API
-        const response = await fetch(`${API_BASE_URL}/check-symptoms`, {
+        const response = await fetch(`${API_BASE_URL}/check-symptoms/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -99,18 +100,50 @@ async function analyzeSymptoms(symptoms) {
             body: JSON.stringify({ symptoms }),
         });
         
-        const data = await response.json();
-        
-        if (!response.ok) {
+        // Validation errors come back as plain JSON before streaming starts
+        if (!response.ok || !response.body) {
+            const data = await response.json();
             throw new Error(data.error || 'Failed to analyze symptoms');
         }
         
-        if (!data.success) {
-            throw new Error(data.error || 'Analysis failed');
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let analysis = '';
+        let finished = false;
+        
+        while (!finished) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Server-sent events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const event = parseEvent(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+                
+                if (event.type === 'chunk') {
+                    if (!analysis) {
+                        hideLoading();
+                    }
+                    analysis += event.data.content;
+                    displayPartialResults(analysis);
+                } else if (event.type === 'done') {
+                    displayResults(event.data);
+                    finished = true;
+                } else if (event.type === 'error') {
+                    throw new Error(event.data.error || 'Analysis failed');
+                }
+            }
         }
         
-        // Show results
-        displayResults(data);
+        if (!finished) {
+            throw new Error('Connection closed before the analysis completed');
+        }
         
     } catch (error) {
         console.error('Error:', error);
@@ -120,6 +153,37 @@ async function analyzeSymptoms(symptoms) {
     }
 }
 
+/**
+ * Parse a single server-sent event frame
+ */
+function parseEvent(frame) {
+    let type = 'message';
+    let data = '';
+    
+    frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            type = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+        }
+    });
+    
+    return { type, data: data ? JSON.parse(data) : {} };
+}
+
+/**
+ * Display the analysis received so far while it is still streaming
+ */
+function displayPartialResults(analysis) {
+    errorContainer.style.display = 'none';
+    analysisResults.innerHTML = formatAnalysis(analysis);
+    
+    if (resultsSection.style.display !== 'block') {
+        resultsSection.style.display = 'block';
+        resultsSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+    }
+}
+
 /**
  * Display analysis results
  */
@@ -2,7 +2,7 @@
 Test Groq API - Simple Demo
 Run this to test if your Groq API key works!
 """
-import requests
+import httpx
 import os
 from dotenv import load_dotenv
 
@@ -51,7 +51,12 @@ def test_groq_api():
     
     try:
         print("⏳ Sending request to Groq API...")
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        with httpx.Client(
+            headers=headers,
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            transport=httpx.HTTPTransport(http2=True, retries=2)
+        ) as client:
+            response = client.post(url, json=payload)
         
         if response.status_code == 200:
             result = response.json()
@@ -78,11 +83,11 @@ def test_groq_api():
             elif response.status_code == 429:
                 print("⏰ Rate limit exceeded - wait a moment and try again")
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print("\n❌ ERROR: Request timed out")
         print("Check your internet connection")
         
-    except requests.exceptions.RequestException as e:
+    except httpx.RequestError as e:
         print(f"\n❌ ERROR: Network error - {e}")
         
     except Exception as e:
@@ -0,0 +1,14 @@
+"""
+WSGI entry point for running the Healthcare Symptom Checker under gunicorn
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+# Patch the standard library before anything else imports socket/ssl so the
+# blocking Groq calls (httpx) yield to other greenlets. sqlite3 is a C module
+# gevent cannot patch; database.run_blocking moves every query, write and
+# maintenance pass onto gevent's threadpool instead.
+from gevent import monkey
+monkey.patch_all()
+
+from app import app  # noqa: E402